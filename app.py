@@ -1,9 +1,14 @@
+import functools
+import sys
+import numpy as np
 import pandas as pd
 from shiny import render, ui, App, reactive
-from shared import data_index
-from shared import data_main
+from shared import load
 
-other_proteins_options = sorted(data_index['Other_proteins'].dropna().str.split(",").explode().str.strip().unique())
+# the sidebar choices need the HAP names, so the data is loaded with the app
+data = load()
+
+other_proteins_options = list(data.hap_names)
 other_proteins_options.remove('Albumin')
 albumin_only_options = ["All", "Yes", "No"]
 
@@ -73,94 +78,95 @@ app_ui = ui.page_sidebar(
         style="text-align: center;")
 )
 
+@functools.lru_cache(maxsize=64)
+def _compute_filtered_labels(albumin_only: str, other_proteins: tuple) -> np.ndarray:
+    """Return the row positions in data_index matching the filter inputs.
+
+    Pure function of the inputs, so results are shared across sessions;
+    the returned array is read-only for that reason.
+    """
+    # Filter by albumin_only using the precomputed row masks
+    mask = data.albumin_masks[albumin_only]
+
+    # Filter by other_proteins if albumin_only is "No"
+    if albumin_only == "No" and other_proteins:
+        selected_proteins = [sys.intern(p) for p in other_proteins]
+        idxs = [data.hap_idx[p] for p in selected_proteins if p in data.hap_idx]
+        mask = mask & data.hap_matrix[:, idxs].any(axis=1)
+
+    rows = np.flatnonzero(mask)
+    rows.flags.writeable = False
+    return rows
+
+def _count_mentions(mention_matrix_T: np.ndarray, idxs: np.ndarray) -> np.ndarray:
+    """Count, per protein, the mentions across the label rows in idxs.
+
+    Selecting the labels and summing them is fused into one vector-matrix
+    product with a 0/1 weight per label, so no gathered copy is made. The
+    matrix is labels x proteins, so each label is one contiguous row, and
+    float32 so the product runs through BLAS; counts are far below
+    float32's exact-integer range.
+    """
+    weights = np.zeros(mention_matrix_T.shape[0], dtype=mention_matrix_T.dtype)
+    weights[idxs] = 1
+    return (weights @ mention_matrix_T).astype(np.int64)
+
 # Define Server Logic
 def server(input, output, session):
 
     @reactive.Calc
     def filtered_index():
-        """Filter the data_index DataFrame based on user inputs."""
-        filtered = data_index.copy()
-
-        # Filter by albumin_only
-        if input.albumin_only() != "All":
-            filtered = filtered[filtered["Albumin_only"] == input.albumin_only()]
-
-        # Filter by other_proteins if albumin_only is "No"
-        if input.albumin_only() == "No" and input.other_proteins():
-            selected_proteins = input.other_proteins()
-            mask = filtered["Other_proteins"].dropna().str.split(",").apply(
-                lambda proteins: any(p.strip() in selected_proteins for p in proteins)
-            )
-            filtered = filtered[mask]
-
-        return filtered
+        """Return the data_index row positions matching the user inputs."""
+        return _compute_filtered_labels(
+            input.albumin_only(), tuple(sorted(input.other_proteins() or ()))
+        )
 
     @output
     @render.table
     def selected_papers():
         """Display detailed study information in a table format."""
-        studies = filtered_index()
+        rows = filtered_index()
 
-        if studies.empty:
+        if len(rows) == 0:
             # Return an empty table with a message
             return pd.DataFrame({"Message": ["No studies match the selected criteria."]})
 
-        # Select relevant columns for display
-        selected_columns = [
-            "Paper",  # Study reference
-            "Other_proteins",  # Full list of other proteins
-            "Sample",  # Biological sample description
-            "Separation_method",  # Separation method used
-            "Detection_method",  # Detection method used
-        ]
-
-        # Return the selected data as a DataFrame
-        return studies[selected_columns].reset_index(drop=True)
+        # Return the selected studies from the precomputed display columns
+        return data.papers_view.iloc[rows].reset_index(drop=True)
 
     @reactive.Calc
     def filtered_main():
         """Filter the data_main DataFrame based on selected studies in data_index."""
-        selected_labels = filtered_index()["Label"].astype(str).tolist()
+        selected_labels = data.paper_labels[filtered_index()].tolist()
 
         # Subset data_main to include only relevant columns
         relevant_columns = ["Protein name", "Protein Uniprot ID"] + selected_labels
-        return data_main.loc[:, data_main.columns.isin(relevant_columns)]
+        idxs = sorted(data.col_to_idx[c] for c in relevant_columns if c in data.col_to_idx)
+        return data.data_main.iloc[:, idxs]
 
     @output
     @render.table
     def aggregated_table():
         """Aggregate protein data and rank by frequency of mentions."""
-        # Get the selected paper labels
-        selected_labels = filtered_index()["Label"].astype(str).tolist()
+        rows = filtered_index()
 
-        if not selected_labels:
+        if len(rows) == 0:
             # Return an empty table with a message if no papers are selected
             return pd.DataFrame({"Message": ["No proteins match the selected criteria."]})
 
-        # Filter `data_main` to include only relevant columns
-        relevant_columns = ["Protein", "Uniprot ID", "Protein Name"] + selected_labels
-        filtered_main = data_main[relevant_columns]
-
-        # Melt the data to create a long format for counting
-        melted = filtered_main.melt(
-            id_vars=["Protein", "Uniprot ID", "Protein Name"] ,
-            value_vars=selected_labels,
-            var_name="Paper",
-            value_name="Mentioned",
-        )
-
-        # Filter for proteins that are mentioned (value = 1)
-        mentioned_proteins = melted[melted["Mentioned"] == 1]
-
-        # Group by Protein name and Uniprot ID to count occurrences
-        aggregated = (
-            mentioned_proteins.groupby(["Protein", "Uniprot ID", "Protein Name"] )
-            .size()
-            .reset_index(name="Count")
-        )
-
-        # Sort by count in descending order
-        aggregated = aggregated.sort_values(by="Count", ascending=False)
+        # Count mentions per protein over the selected papers' label columns
+        idxs = data.paper_label_idx[rows]
+        idxs = idxs[idxs >= 0]
+        if np.unique(idxs).size == len(data.label_cols):
+            # every label column is selected, so the totals are precomputed
+            counts = data.total_counts
+        else:
+            counts = _count_mentions(data.mention_matrix_T, idxs)
+
+        # Keep proteins mentioned at least once, sorted by count in descending order
+        mentioned = np.flatnonzero(counts)
+        order = mentioned[np.argsort(-counts[mentioned], kind="stable")]
+        aggregated = data.protein_meta.iloc[order].assign(Count=counts[order])
 
         return aggregated
     
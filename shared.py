@@ -1,11 +1,91 @@
 from pathlib import Path
+from types import SimpleNamespace
+import functools
+import sys
 import numpy as np
 import pandas as pd
 
 app_dir = Path(__file__).parent
 #df = pd.read_csv(app_dir / "penguins.csv")
 
-data_index = pd.read_csv(app_dir / "data_index.csv", encoding="macroman")
-data_index = data_index.replace(r'^\s*$',np.nan, regex=True)
-data_main= pd.read_csv(app_dir/ "data_main.csv")
-data_main = data_main.replace(r'^\s*$',np.nan, regex=True)
\ No newline at end of file
+
+def _load_index():
+    """Read data_index.csv and build the study-level lookup tables."""
+    data_index = pd.read_csv(app_dir / "data_index.csv", encoding="macroman")
+    data_index = data_index.replace(r'^\s*$',np.nan, regex=True)
+    data_index['Albumin_only'] = data_index['Albumin_only'].astype('category')
+    # row masks for each "Albumin only study?" choice
+    albumin_masks = {v: (data_index['Albumin_only'].to_numpy() == v) for v in ('Yes', 'No')}
+    albumin_masks['All'] = np.ones(len(data_index), dtype=bool)
+    # parse the comma-separated HAP list once so filters don't re-split it per call;
+    # names are interned so repeated tokens share one str object
+    data_index['_Other_proteins_tuple'] = data_index['Other_proteins'].fillna('').map(
+        lambda s: tuple(sys.intern(p.strip()) for p in s.split(',') if p.strip())
+    )
+    # study x HAP membership matrix for the "Other HAPs" filter
+    hap_names = sorted(frozenset().union(*data_index['_Other_proteins_tuple']))
+    hap_idx = {h: i for i, h in enumerate(hap_names)}
+    hap_matrix = np.zeros((len(data_index), len(hap_names)), dtype=bool)
+    hap_pairs = data_index['_Other_proteins_tuple'].reset_index(drop=True).explode().dropna()
+    hap_matrix[hap_pairs.index.to_numpy(), hap_pairs.map(hap_idx).to_numpy(dtype=np.intp)] = True
+    # paper labels as they appear in the data_main column headers
+    paper_labels = data_index['Label'].astype(str).to_numpy()
+    # columns shown in the "Details of included studies" table
+    papers_view = data_index[
+        [
+            "Paper",  # Study reference
+            "Other_proteins",  # Full list of other proteins
+            "Sample",  # Biological sample description
+            "Separation_method",  # Separation method used
+            "Detection_method",  # Detection method used
+        ]
+    ].reset_index(drop=True)
+    return dict(
+        data_index=data_index,
+        albumin_masks=albumin_masks,
+        hap_names=hap_names,
+        hap_idx=hap_idx,
+        hap_matrix=hap_matrix,
+        paper_labels=paper_labels,
+        papers_view=papers_view,
+    )
+
+
+def _load_main():
+    """Read data_main.csv and build the protein x paper mention tables."""
+    data_main = pd.read_csv(app_dir / "data_main.csv")
+    data_main = data_main.replace(r'^\s*$',np.nan, regex=True)
+    col_to_idx = {c: i for i, c in enumerate(data_main.columns)}
+
+    # every column other than the protein identifiers is a 0/1 paper label;
+    # keep the flags as a compact uint8 matrix (proteins x paper labels)
+    label_cols = [c for c in data_main.columns if c not in ("Protein", "Uniprot ID", "Protein Name")]
+    mention_matrix = data_main[label_cols].fillna(0).to_numpy(dtype=np.uint8, copy=True)
+    # labels x proteins float32 copy, one contiguous row per label, for the
+    # BLAS vector-matrix product that counts mentions
+    mention_matrix_T = np.ascontiguousarray(mention_matrix.T, dtype=np.float32)
+    label_to_idx = {l: i for i, l in enumerate(label_cols)}
+    # per-protein mentions across all papers, for the unfiltered case
+    total_counts = mention_matrix.sum(axis=1, dtype=np.int64)
+    protein_meta = data_main[["Protein", "Uniprot ID", "Protein Name"]].reset_index(drop=True)
+    return dict(
+        data_main=data_main,
+        col_to_idx=col_to_idx,
+        label_cols=label_cols,
+        mention_matrix=mention_matrix,
+        mention_matrix_T=mention_matrix_T,
+        label_to_idx=label_to_idx,
+        total_counts=total_counts,
+        protein_meta=protein_meta,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def load():
+    """Load both datasets and their derived tables on first use."""
+    data = SimpleNamespace(**_load_index(), **_load_main())
+    # mention-matrix column of each study in data_index, -1 if it has none
+    data.paper_label_idx = np.array(
+        [data.label_to_idx.get(l, -1) for l in data.paper_labels], dtype=np.intp
+    )
+    return data